@@ -1,17 +1,49 @@
 
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
+import diskcache
+import functools
+import hashlib
+import os
+import orjson
+import threading
 import uuid
+import weakref
 import concurrent.futures
-from typing import Dict
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional
 
-from portia import PlanRun
+from portia.plan_run import PlanRun
 from plans import travel_plan
-from constants import ws_after_hook
+from constants import active_plan_run_id, configure_ws_hook
+from tool.apify_clients import apify_failures
+from log import logger
+from serialization import encode_output, json_default, serialize_output
+from state_store import ShardedStateStore
 
-app = FastAPI()
+# Event loop serving requests, used to wake long-poll waiters from worker threads
+event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	global event_loop
+	event_loop = asyncio.get_running_loop()
+	# Dedicated pool for long-running Portia plans so they can't starve FastAPI's default pool
+	plan_executor = concurrent.futures.ThreadPoolExecutor(
+		max_workers=MAX_INFLIGHT,
+		thread_name_prefix="plan",
+	)
+	app.state.plan_executor = plan_executor
+	# Admission control: cap concurrently running plans and how many may wait behind them
+	app.state.plan_sem = asyncio.Semaphore(MAX_INFLIGHT)
+	app.state.plan_tasks = set()
+	yield
+	plan_executor.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Allow CORS for local dev
 app.add_middleware(
@@ -22,108 +54,273 @@ app.add_middleware(
 	allow_headers=["*"],
 )
 
-# In-memory store for plan runs
-plan_state_store: Dict[str, Dict] = {}
+# In-memory store for plan runs, shared with the Portia hook thread
+plan_state_store = ShardedStateStore()
 # Map original plan IDs to Portia plan run IDs  
-plan_id_mapping: Dict[str, str] = {}
+plan_id_mapping = ShardedStateStore()
+# Inverse of plan_id_mapping so the hook can resolve Portia IDs in O(1)
+portia_to_original = ShardedStateStore()
+# Step outputs reported by the hook, kept apart from the state so each step only adds its own entry
+plan_step_outputs = ShardedStateStore()
+# Events signalled whenever a plan's state changes, awaited by long-poll requests.
+# Held weakly: an event lives only while some request is waiting on it, so idle and
+# finished plans drop out without any bookkeeping.
+plan_events: "weakref.WeakValueDictionary[str, asyncio.Event]" = weakref.WeakValueDictionary()
+
+# Plans whose waiters still need waking, drained in one batch on the event loop
+pending_wakeups: set = set()
+pending_wakeups_lock = threading.Lock()
+
+# Upper bound on how long a single state request may be held open
+MAX_WAIT_MS = 30000
+# After a wake-up, let quick successive steps land before answering so they go out as one response
+POLL_COALESCE_S = 0.03
+# Plans allowed to execute concurrently, and how many more may queue before /plan/start returns 429.
+# One limit sizes both the semaphore and the plan executor, so every admitted plan has a worker
+# and queued plans wait as PREPARING instead of reporting IN_PROGRESS from the executor queue.
+MAX_INFLIGHT = int(os.getenv("PLAN_WORKERS", "8"))
+MAX_QUEUED = int(os.getenv("MAX_QUEUED", "64"))
+TERMINAL_STATES = ("COMPLETE", "FAILED")
+
+# Completed plan results keyed by trip details. Flight and hotel prices drift, so entries expire.
+PLAN_FIELDS = ("origin", "destination", "departure_date", "return_date", "cabin_class", "passengers")
+PLAN_DATE_FIELDS = ("departure_date", "return_date")
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", "3600"))
+plan_cache = diskcache.Cache(os.getenv("PLAN_CACHE_DIR", ".plan_cache"), size_limit=2**30)
+
+def normalize_plan_field(value):
+	"""Fold cosmetic differences (case, surrounding/repeated spaces, numeric strings) out of a trip field."""
+	if isinstance(value, str):
+		value = " ".join(value.split()).casefold()
+		# isdecimal, not isdigit: "²" is a digit int() rejects. Keep within orjson's 64-bit range.
+		if value.isdecimal() and len(value) <= 18:
+			return int(value)
+		return value
+	return value
+
+def is_absolute_date(value) -> bool:
+	"""True for YYYY-MM-DD dates; relative ones like "tomorrow" mean a different trip each day."""
+	try:
+		date.fromisoformat(str(value).strip())
+	except ValueError:
+		return False
+	return True
+
+def plan_cache_key(form_data: dict) -> Optional[str]:
+	"""Hash the normalized trip details so equivalent requests share a cached result.
+
+	Returns None when the trip can't be cached because its dates are relative.
+	"""
+	if not all(is_absolute_date(form_data.get(name)) for name in PLAN_DATE_FIELDS):
+		return None
+	fields = {name: normalize_plan_field(form_data.get(name)) for name in PLAN_FIELDS}
+	return hashlib.blake2b(orjson.dumps(fields, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+def notify_plan_waiters(plan_run_id: str):
+	"""Wake long-poll requests waiting on a plan. Safe to call from worker threads.
+
+	Every waiter shares one event, so a single set() releases all of them at once.
+	Notifications are batched: any that arrive before the loop gets to the flush
+	ride along with the first one instead of each scheduling its own callback.
+	"""
+	if event_loop is None or plan_run_id not in plan_events:
+		return
+	with pending_wakeups_lock:
+		schedule_flush = not pending_wakeups
+		pending_wakeups.add(plan_run_id)
+	if schedule_flush:
+		event_loop.call_soon_threadsafe(flush_plan_wakeups)
+
+def flush_plan_wakeups():
+	"""Signal every plan with a pending notification. Runs on the event loop."""
+	with pending_wakeups_lock:
+		batch = list(pending_wakeups)
+		pending_wakeups.clear()
+	for plan_run_id in batch:
+		event = plan_events.get(plan_run_id)
+		if event is not None:
+			event.set()
+			event.clear()
 
 # Simple state update function - stores state for polling
 def update_plan_state(plan_run_id: str, state: dict):
 	"""Update plan state in the store for polling."""
-	print(f"📊 Updating plan state for {plan_run_id}: {state.get('state', 'UNKNOWN')}")
+	logger.info("📊 Updating plan state for %s: %s", plan_run_id, state.get('state', 'UNKNOWN'))
+	# Serialize the polling response once per state change; GETs reuse the bytes until the next update
+	state["__bytes__"] = serialize_outputs_safe(build_state_response(plan_run_id, state))
 	plan_state_store[plan_run_id] = state
+	notify_plan_waiters(plan_run_id)
+
+def link_plan_ids(plan_run_id: str, portia_plan_id: str):
+	"""Record the mapping between our plan ID and Portia's run ID in both directions."""
+	plan_id_mapping[plan_run_id] = portia_plan_id
+	portia_to_original[portia_plan_id] = plan_run_id
+
+def record_step_update(plan_run_id: str, update: dict):
+	"""Apply a per-step delta from ws_after_hook: store its step outputs, then the new state."""
+	step_outputs = update.pop("step_outputs", {})
+	plan_step_outputs.update(plan_run_id, lambda existing: {**(existing or {}), **step_outputs})
+	update_plan_state(plan_run_id, update)
 
-# Set the notify function and state store to avoid circular imports
-ws_after_hook.notify_function = update_plan_state
-ws_after_hook.plan_state_store = plan_state_store
-ws_after_hook.plan_id_mapping = plan_id_mapping
+def plan_outputs(plan_run_id: str, state: dict) -> dict:
+	"""Materialize a plan's outputs, falling back to the step outputs recorded by the hook."""
+	if state.get("outputs"):
+		return state["outputs"]
+	step_outputs = plan_step_outputs.get(plan_run_id)
+	return {"step_outputs": step_outputs} if step_outputs else {}
+
+def build_state_response(plan_run_id: str, state: dict) -> dict:
+	"""Build the polling response body for a stored plan state."""
+	response = {
+		"plan_run_id": state.get("plan_run_id", plan_run_id),
+		"state": state.get("state", "UNKNOWN"),
+		"current_step_index": state.get("current_step_index", 0),
+		"outputs": plan_outputs(plan_run_id, state),
+		"final_output": state.get("final_output") if "final_output" in state else None,
+		"error": str(state["error"]) if "error" in state else None,
+		"timestamp": state.get("timestamp", "unknown")
+	}
+	
+	# Add additional debug info
+	if state.get("state") == "IN_PROGRESS":
+		response["status_message"] = f"Processing step {state.get('current_step_index', 0) + 1}"
+	elif state.get("state") == "COMPLETE":
+		response["status_message"] = "Plan completed successfully"
+	elif state.get("state") == "FAILED":
+		response["status_message"] = f"Plan failed: {state.get('error', 'Unknown error')}"
+	else:
+		response["status_message"] = f"Plan state: {state.get('state', 'unknown')}"
+	
+	return response
+
+def outputs_since(outputs: dict, since_step: int) -> dict:
+	"""Trim step outputs to since_step onwards, for clients that already hold the earlier ones.
+
+	since_step itself is included: the client's snapshot at that step may predate its output,
+	and updates within a step don't wake waiters. Re-sending it is harmless since clients merge.
+	"""
+	step_outputs = outputs.get("step_outputs")
+	if not step_outputs:
+		return outputs
+	newer = {name: entry for name, entry in step_outputs.items() if entry.get("step_index", -1) >= since_step}
+	return {**outputs, "step_outputs": newer}
+
+# Bind the notify function and ID mapping to the hook (set here to avoid circular imports)
+configure_ws_hook(record_step_update, portia_to_original)
+
+async def read_cached_plan(cache_key: str) -> Optional[bytes]:
+	"""Look up a cached plan result off the event loop (diskcache is SQLite-backed). Errors count as a miss."""
+	try:
+		return await asyncio.get_running_loop().run_in_executor(None, plan_cache.get, cache_key)
+	except Exception as e:
+		logger.warning("⚠️ Plan cache read failed: %s", e)
+		return None
+
+async def write_cached_plan(cache_key: str, cached_state: bytes):
+	"""Store a completed plan result off the event loop. A failed write only loses the cache entry."""
+	try:
+		await asyncio.get_running_loop().run_in_executor(
+			None, functools.partial(plan_cache.set, cache_key, cached_state, expire=PLAN_CACHE_TTL)
+		)
+	except Exception as e:
+		logger.warning("⚠️ Plan cache write failed: %s", e)
 
 async def execute_plan_async(plan_run_id: str, form_data: dict):
-	"""Execute the travel plan asynchronously in a thread pool to avoid blocking."""
+	"""Execute the travel plan asynchronously in a thread pool to avoid blocking.
+
+	At most MAX_INFLIGHT plans run at once; the rest wait here on the semaphore.
+	Trips already planned within PLAN_CACHE_TTL are answered from plan_cache without running Portia.
+	Any error, including in the cache lookup, ends the plan as FAILED rather than leaving it PREPARING.
+	"""
 	try:
-		print(f"🚀 Starting plan execution for {plan_run_id}")
-		
-		# Update state to IN_PROGRESS
-		state = {
-			"plan_run_id": plan_run_id,
-			"state": "IN_PROGRESS", 
-			"current_step_index": 0,
-			"outputs": {},
-		}
-		plan_state_store[plan_run_id] = state
-		
-		# Define the blocking function to run in thread pool
-		def run_travel_plan():
-			"""Run the travel plan in a separate thread to avoid blocking the event loop."""
-			print(f"🔄 Executing travel plan in thread for {plan_run_id}")
-			return travel_plan(
-				form_data["origin"], 
-				form_data["destination"], 
-				form_data["departure_date"], 
-				form_data["return_date"], 
-				form_data["cabin_class"], 
-				form_data["passengers"]
-			)
-		
-		# Run the plan in a thread pool executor to avoid blocking the event loop
-		print(f"🧵 Running plan {plan_run_id} in thread pool executor")
-		loop = asyncio.get_event_loop()
-		
-		# Use run_in_executor to run the blocking function in a thread pool
-		result: PlanRun = await loop.run_in_executor(None, run_travel_plan)
-		
-		print(f"✅ Plan execution completed in thread for {plan_run_id}")
+		cache_key = plan_cache_key(form_data)
+		cached = await read_cached_plan(cache_key) if cache_key else None
+		if cached is not None:
+			logger.info("⚡ Cache hit for plan %s, skipping execution", plan_run_id)
+			update_plan_state(plan_run_id, {**orjson.loads(cached), "plan_run_id": plan_run_id})
+			return
 		
-		# Store the mapping between our plan ID and Portia's plan run ID
-		plan_id_mapping[plan_run_id] = result.id
-		print(f"📋 Mapped plan ID {plan_run_id} to Portia plan run ID {result.id}")
-		
-		# Ensure final state is properly set (hooks should have done this already)
-		final_outputs = {}
-		if hasattr(result.outputs, 'final_output') and result.outputs.final_output:
-			final_outputs = {"final_output": result.outputs.final_output.model_dump_json() if hasattr(result.outputs.final_output, 'model_dump_json') else str(result.outputs.final_output)}
-		elif plan_run_id in plan_state_store and "outputs" in plan_state_store[plan_run_id]:
-			# Use outputs from hooks if available
-			final_outputs = plan_state_store[plan_run_id]["outputs"]
-		
-		final_state = {
-			"plan_run_id": plan_run_id,
-			"state": result.state,
-			"current_step_index": result.current_step_index,
-			"outputs": final_outputs,
-		}
-		
-		if result.state == "COMPLETE":
-			if hasattr(result.outputs, 'final_output'):
+		# Filled by the search tools when they fall back to stub data
+		failures: list = []
+		async with app.state.plan_sem:
+			logger.info("🚀 Starting plan execution for %s", plan_run_id)
+			
+			# Update state to IN_PROGRESS
+			state = {
+				"plan_run_id": plan_run_id,
+				"state": "IN_PROGRESS", 
+				"current_step_index": 0,
+				"outputs": {},
+			}
+			update_plan_state(plan_run_id, state)
+			
+			# Define the blocking function to run in thread pool
+			def run_travel_plan():
+				"""Run the travel plan in a separate thread to avoid blocking the event loop."""
+				logger.info("🔄 Executing travel plan in thread for %s", plan_run_id)
+				# Portia's run ID only exists once the run returns; bind ours so the hook reports under it.
+				# The failure list is shared, not copied, into the tool calls' contexts.
+				token = active_plan_run_id.set(plan_run_id)
+				failures_token = apify_failures.set(failures)
 				try:
-					if hasattr(result.outputs.final_output, 'model_dump'):
-						final_state["final_output"] = result.outputs.final_output.model_dump()
-					elif hasattr(result.outputs.final_output, 'dict'):
-						final_state["final_output"] = result.outputs.final_output.dict()
-					else:
-						final_state["final_output"] = str(result.outputs.final_output)
-				except Exception as e:
-					print(f"⚠️ Error serializing final output: {e}")
-					final_state["final_output"] = str(result.outputs.final_output)
+					return travel_plan(
+						form_data["origin"], 
+						form_data["destination"], 
+						form_data["departure_date"], 
+						form_data["return_date"], 
+						form_data["cabin_class"], 
+						form_data["passengers"]
+					)
+				finally:
+					apify_failures.reset(failures_token)
+					active_plan_run_id.reset(token)
+			
+			# Run the plan in the dedicated plan executor to avoid blocking the event loop
+			logger.info("🧵 Running plan %s in plan executor", plan_run_id)
+			loop = asyncio.get_running_loop()
+			
+			# Use run_in_executor to run the blocking function in a thread pool
+			result: PlanRun = await loop.run_in_executor(app.state.plan_executor, run_travel_plan)
+			
+			logger.info("✅ Plan execution completed in thread for %s", plan_run_id)
+			
+			# Store the mapping between our plan ID and Portia's plan run ID
+			link_plan_ids(plan_run_id, result.id)
+			logger.info("📋 Mapped plan ID %s to Portia plan run ID %s", plan_run_id, result.id)
+			
+			# Ensure final state is properly set (hooks should have done this already)
+			final_output = getattr(result.outputs, 'final_output', None)
+			final_outputs = {}
+			if final_output:
+				# Keep the hook's step outputs alongside, so delta clients still receive the last step
+				final_outputs = {**plan_outputs(plan_run_id, {}), "final_output": orjson.Fragment(encode_output(final_output))}
 			else:
-				try:
-					if hasattr(result.outputs, 'model_dump'):
-						final_state["final_output"] = result.outputs.model_dump()
-					elif hasattr(result.outputs, 'dict'):
-						final_state["final_output"] = result.outputs.dict()
-					else:
-						final_state["final_output"] = str(result.outputs)
-				except Exception as e:
-					print(f"⚠️ Error serializing outputs: {e}")
-					final_state["final_output"] = str(result.outputs)
-		
-		plan_state_store[plan_run_id] = final_state
-		print(f"✅ Plan execution completed for {plan_run_id} with state: {final_state['state']}")
-		
+				# Use outputs from hooks if available
+				final_outputs = plan_outputs(plan_run_id, plan_state_store.get(plan_run_id, {}))
+			
+			final_state = {
+				"plan_run_id": plan_run_id,
+				"state": result.state,
+				"current_step_index": result.current_step_index,
+				"outputs": final_outputs,
+			}
+			
+			cached_state = None
+			if result.state == "COMPLETE":
+				final_state["final_output"] = serialize_output(final_output if final_output is not None else result.outputs)
+				# Don't keep results built on stub rows from a failed or unconfigured Apify call
+				if cache_key and not failures:
+					cached_state = serialize_outputs_safe(final_state)
+				elif failures:
+					logger.info("🚫 Not caching plan %s: %s", plan_run_id, "; ".join(failures))
+			
+			update_plan_state(plan_run_id, final_state)
+			logger.info("✅ Plan execution completed for %s with state: %s", plan_run_id, final_state['state'])
+			if cached_state is not None:
+				await write_cached_plan(cache_key, cached_state)
+			
 	except Exception as e:
-		print(f"❌ Error in execute_plan_async: {e}")
-		import traceback
-		print(f"🔍 Full traceback: {traceback.format_exc()}")
+		logger.exception("❌ Error in execute_plan_async: %s", e)
 		
 		# Handle errors
 		error_state = {
@@ -132,94 +329,45 @@ async def execute_plan_async(plan_run_id: str, form_data: dict):
 			"current_step_index": -1,
 			"error": str(e),
 		}
-		plan_state_store[plan_run_id] = error_state
+		update_plan_state(plan_run_id, error_state)
 
-def serialize_outputs_safe(outputs):
-	"""Safely serialize outputs to JSON, handling complex objects."""
-	if not outputs:
-		return {}
-	
+def serialize_outputs_safe(outputs) -> bytes:
+	"""Serialize outputs to JSON bytes in a single pass, stringifying complex objects.
+
+	default is only consulted for values orjson can't encode natively, so JSON-safe
+	payloads cost nothing extra and unsupported ones don't restart the encode.
+	Non-str dict keys are stringified, as json.dumps did.
+	"""
+	return orjson.dumps(outputs, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+async def wait_for_plan_update(plan_run_id: str, wait_ms: int, since_step: Optional[int]):
+	"""Block until the plan moves past since_step (default: its current step), finishes, or wait_ms elapses."""
+	state = plan_state_store.get(plan_run_id)
+	if state is None or state.get("state") in TERMINAL_STATES:
+		return
+	if since_step is None:
+		since_step = state.get("current_step_index", 0)
+
+	event = plan_events.setdefault(plan_run_id, asyncio.Event())
+	woken = False
 	try:
-		# Try to serialize the outputs
-		import json
-		json.dumps(outputs)
-		return outputs
-	except (TypeError, ValueError):
-		# If serialization fails, convert complex objects to strings
-		serialized = {}
-		for key, value in outputs.items():
-			try:
-				json.dumps(value)
-				serialized[key] = value
-			except (TypeError, ValueError):
-				# Convert non-serializable objects to strings
-				serialized[key] = str(value)
-		return serialized
+		async with asyncio.timeout(min(wait_ms, MAX_WAIT_MS) / 1000):
+			while True:
+				state = plan_state_store.get(plan_run_id, {})
+				if state.get("state") in TERMINAL_STATES or state.get("current_step_index", 0) > since_step:
+					if woken:
+						# Latest state wins: the caller reads the store after this returns
+						await asyncio.sleep(POLL_COALESCE_S)
+					return
+				await event.wait()
+				woken = True
+	except TimeoutError:
+		pass
 
-@app.get("/plan/{plan_run_id}/state")
-async def get_plan_state(plan_run_id: str):
-	"""Get the current state of a plan run with detailed information."""
-	print(f"🔍 Checking state for plan: {plan_run_id}")
-	
-	# Check direct plan ID first
-	if plan_run_id in plan_state_store:
-		state = plan_state_store[plan_run_id]
-		print(f"📊 Found state for plan {plan_run_id}: {state.get('state', 'UNKNOWN')}")
-		
-		response = {
-			"plan_run_id": state.get("plan_run_id", plan_run_id),
-			"state": state.get("state", "UNKNOWN"),
-			"current_step_index": state.get("current_step_index", 0),
-			"outputs": serialize_outputs_safe(state.get("outputs", {})),
-			"final_output": state.get("final_output") if "final_output" in state else None,
-			"error": str(state["error"]) if "error" in state else None,
-			"timestamp": state.get("timestamp", "unknown")
-		}
-		
-		# Add additional debug info
-		if state.get("state") == "IN_PROGRESS":
-			response["status_message"] = f"Processing step {state.get('current_step_index', 0) + 1}"
-		elif state.get("state") == "COMPLETE":
-			response["status_message"] = "Plan completed successfully"
-		elif state.get("state") == "FAILED":
-			response["status_message"] = f"Plan failed: {state.get('error', 'Unknown error')}"
-		else:
-			response["status_message"] = f"Plan state: {state.get('state', 'unknown')}"
-		
-		return JSONResponse(response)
-	
-	# Check if this plan ID is mapped to a Portia plan run ID
-	portia_plan_id = plan_id_mapping.get(plan_run_id)
-	if portia_plan_id and portia_plan_id in plan_state_store:
-		state = plan_state_store[portia_plan_id]
-		print(f"📊 Found mapped state for plan {plan_run_id} -> {portia_plan_id}: {state.get('state', 'UNKNOWN')}")
-		
-		response = {
-			"plan_run_id": plan_run_id,  # Return the original plan ID
-			"state": state.get("state", "UNKNOWN"),
-			"current_step_index": state.get("current_step_index", 0),
-			"outputs": serialize_outputs_safe(state.get("outputs", {})),
-			"final_output": state.get("final_output") if "final_output" in state else None,
-			"error": str(state["error"]) if "error" in state else None,
-			"portia_plan_id": portia_plan_id,
-			"timestamp": state.get("timestamp", "unknown")
-		}
-		
-		# Add status message
-		if state.get("state") == "IN_PROGRESS":
-			response["status_message"] = f"Processing step {state.get('current_step_index', 0) + 1}"
-		elif state.get("state") == "COMPLETE":
-			response["status_message"] = "Plan completed successfully"
-		elif state.get("state") == "FAILED":
-			response["status_message"] = f"Plan failed: {state.get('error', 'Unknown error')}"
-		else:
-			response["status_message"] = f"Plan state: {state.get('state', 'unknown')}"
-		
-		return JSONResponse(response)
-	
-	# Plan not found
-	print(f"❌ Plan not found: {plan_run_id}")
-	return JSONResponse({
+def plan_not_found(plan_run_id: str) -> ORJSONResponse:
+	"""404 response for a plan ID that matches neither a stored nor a mapped plan."""
+	logger.warning("❌ Plan not found: %s", plan_run_id)
+	return ORJSONResponse({
 		"plan_run_id": plan_run_id,
 		"state": "NOT_FOUND",
 		"current_step_index": -1,
@@ -228,16 +376,67 @@ async def get_plan_state(plan_run_id: str):
 		"status_message": "Plan not found in the system"
 	}, status_code=404)
 
+@app.get("/plan/{plan_run_id}/state")
+async def get_plan_state(plan_run_id: str, wait_ms: Optional[int] = None, since_step: Optional[int] = None):
+	"""Get the current state of a plan run with detailed information.
+
+	Pass wait_ms to long-poll: the request is held until the plan advances past
+	since_step (the current step if omitted), finishes, or the wait expires.
+	Passing since_step also marks the response as a delta: step_outputs only holds
+	steps from since_step on and the client merges them into what it already has.
+	"""
+	logger.info("🔍 Checking state for plan: %s", plan_run_id)
+	
+	if wait_ms and wait_ms > 0:
+		await wait_for_plan_update(plan_run_id, wait_ms, since_step)
+	
+	# Check direct plan ID first
+	state = plan_state_store.get(plan_run_id)
+	if state is not None:
+		logger.info("📊 Found state for plan %s: %s", plan_run_id, state.get('state', 'UNKNOWN'))
+		
+		if since_step is None:
+			# Full snapshot, served from the bytes cached at the last state change
+			body = state.get("__bytes__") or serialize_outputs_safe(build_state_response(plan_run_id, state))
+			return Response(content=body, media_type="application/json")
+		response = build_state_response(plan_run_id, state)
+	else:
+		# Check if this plan ID is mapped to a Portia plan run ID
+		portia_plan_id = plan_id_mapping.get(plan_run_id)
+		state = plan_state_store.get(portia_plan_id) if portia_plan_id else None
+		if state is None:
+			return plan_not_found(plan_run_id)
+		logger.info("📊 Found mapped state for plan %s -> %s: %s", plan_run_id, portia_plan_id, state.get('state', 'UNKNOWN'))
+		
+		response = build_state_response(portia_plan_id, state)
+		response["plan_run_id"] = plan_run_id  # Return the original plan ID
+		response["portia_plan_id"] = portia_plan_id
+	
+	if since_step is not None:
+		response["outputs"] = outputs_since(response["outputs"], since_step)
+		response["delta"] = True
+	return Response(content=serialize_outputs_safe(response), media_type="application/json")
+
 @app.post("/plan/start")
 async def start_plan(request: Request):
 	"""Start a new travel plan and return the plan ID for polling."""
 	data = await request.json()
 	
+	# Back-pressure at the API layer instead of piling up work behind the LLM client
+	plan_tasks = app.state.plan_tasks
+	if len(plan_tasks) >= MAX_INFLIGHT + MAX_QUEUED:
+		logger.warning("⛔ Rejecting plan: %d plans already running or queued", len(plan_tasks))
+		return ORJSONResponse({
+			"state": "REJECTED",
+			"error": "Too many plans in progress",
+			"status_message": "The server is busy, please try again shortly"
+		}, status_code=429)
+	
 	# Generate a unique plan run ID
 	plan_run_id = str(uuid.uuid4())
 	
-	print(f"🚀 Starting new plan: {plan_run_id}")
-	print(f"📋 Plan details: {data}")
+	logger.info("🚀 Starting new plan: %s", plan_run_id)
+	logger.info("📋 Plan details: %s", data)
 	
 	# Return immediately with the plan ID and initial state
 	initial_state = {
@@ -250,8 +449,10 @@ async def start_plan(request: Request):
 	}
 	plan_state_store[plan_run_id] = initial_state
 	
-	# Start the plan execution in the background
-	asyncio.create_task(execute_plan_async(plan_run_id, data))
+	# Start the plan execution in the background, keeping a reference until it finishes
+	task = asyncio.create_task(execute_plan_async(plan_run_id, data))
+	plan_tasks.add(task)
+	task.add_done_callback(plan_tasks.discard)
 	
-	print(f"✅ Plan {plan_run_id} started, returning initial state")
-	return JSONResponse(initial_state)
\ No newline at end of file
+	logger.info("✅ Plan %s started, returning initial state", plan_run_id)
+	return ORJSONResponse(initial_state)
\ No newline at end of file
@@ -1,8 +1,20 @@
+import logging
 import os
-from portia import Config, ExecutionHooks, GenerativeModelsConfig, LLMProvider, LLMTool, LogLevel, Output, Plan, PlanRun, Portia, Step, StorageClass
+import orjson
+from contextvars import ContextVar
+from typing import Callable, Optional
+from portia.config import Config, GenerativeModelsConfig, LLMProvider, StorageClass
+from portia.execution_agents.output import Output
+from portia.execution_hooks import ExecutionHooks
+from portia.open_source_tools.llm_tool import LLMTool
+from portia.plan import Plan, Step
+from portia.plan_run import PlanRun
+from portia.portia import Portia
 
 from tool.flight_search_tool import FlightSearchTool
 from tool.hotel_search_tool import AccomodationSearchTool
+from log import logger
+from serialization import encode_output
 
 myTools = [
     FlightSearchTool(),
@@ -27,66 +39,67 @@ google_config = Config.from_default(
     # storage_dir="demo_runs"
 )
 
+# Our plan ID for the run executing in the current context. Set before Portia starts the
+# run, so hook updates land under the ID clients poll while the Portia run ID is unknown.
+active_plan_run_id: ContextVar[Optional[str]] = ContextVar("active_plan_run_id", default=None)
+
+# Bound once by app.py via configure_ws_hook (set later to avoid circular imports)
+_NOTIFY: Optional[Callable[[str, dict], None]] = None
+_PORTIA_TO_ORIGINAL = None
+
+def configure_ws_hook(notify: Callable[[str, dict], None], reverse_mapping):
+    """Wire ws_after_hook to the app's notify function and the Portia-to-original ID mapping."""
+    global _NOTIFY, _PORTIA_TO_ORIGINAL
+    _NOTIFY = notify
+    _PORTIA_TO_ORIGINAL = reverse_mapping
+
 def ws_after_hook(plan: Plan, plan_run: PlanRun, step: Step, output: Output):
-    step_index = step.index if hasattr(step, 'index') else plan_run.current_step_index
-    print(f"Hook triggered for plan: {plan.id}, run: {plan_run.id}, step: {step_index}, output type: {type(output)}")
+    step_index = getattr(step, 'index', plan_run.current_step_index)
+    # Runs once per step on plan worker threads; skip building log records unless debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Hook triggered for plan: %s, run: %s, step: %s, output type: %s", plan.id, plan_run.id, step_index, type(output))
     
-    # We'll set this function later to avoid circular imports
-    if hasattr(ws_after_hook, 'notify_function') and hasattr(ws_after_hook, 'plan_state_store'):
-        
-        # Create step output entry
-        step_output_name = f"step_{step_index}" if not hasattr(output, 'name') else output.name
-        
-        step_outputs = {
-            step_output_name: {
-                "output_name": step_output_name,
-                "value": output.model_dump_json() if hasattr(output, 'model_dump_json') else str(output),
-                "summary": output.get_summary() if hasattr(output, 'get_summary') else (str(output)[:200] + "..." if len(str(output)) > 200 else str(output)),
-                "step_index": step_index
-            }
-        }
-        
-        # Find the original plan ID if it exists in the mapping
-        original_plan_id = None
-        if hasattr(ws_after_hook, 'plan_id_mapping'):
-            for orig_id, portia_id in ws_after_hook.plan_id_mapping.items():
-                if portia_id == plan_run.id:
-                    original_plan_id = orig_id
-                    break
-        
-        # Create state object for notification
-        state = {
-            "plan_run_id": original_plan_id if original_plan_id else plan_run.id,
-            "state": "IN_PROGRESS",
-            "current_step_index": step_index,
-            "outputs": {"step_outputs": step_outputs},
+    # Nothing to report to until app.py has wired the hook up
+    if _NOTIFY is None:
+        return
+
+    # Create step output entry
+    step_output_name = getattr(output, 'name', None) or f"step_{step_index}"
+    get_summary = getattr(output, 'get_summary', None)
+    
+    # Encode the value to JSON bytes once and wrap it as a Fragment, so later response
+    # serialization splices it in verbatim instead of re-escaping a string
+    value = orjson.Fragment(encode_output(output))
+    
+    step_outputs = {
+        step_output_name: {
+            "output_name": step_output_name,
+            "value": value,
+            "summary": get_summary() if get_summary else (str(output)[:200] + "..." if len(str(output)) > 200 else str(output)),
+            "step_index": step_index
         }
-        
-        # If it's the final step, include final output and mark as complete
-        if step_index >= len(plan.steps) - 1:
-            state["final_output"] = output.model_dump_json() if hasattr(output, 'model_dump_json') else str(output)
-            state["state"] = "COMPLETE"
-        
-        # Update the plan state store 
-        plan_id_to_use = original_plan_id if original_plan_id else plan_run.id
-        
-        # Merge with existing outputs if they exist
-        if plan_id_to_use in ws_after_hook.plan_state_store:
-            existing_state = ws_after_hook.plan_state_store[plan_id_to_use]
-            if "outputs" in existing_state and "step_outputs" in existing_state["outputs"]:
-                # Merge step outputs
-                existing_step_outputs = existing_state["outputs"]["step_outputs"]
-                existing_step_outputs.update(step_outputs)
-                state["outputs"]["step_outputs"] = existing_step_outputs
-        
-        ws_after_hook.plan_state_store[plan_id_to_use] = state
-        
-        # Store with Portia ID as well for consistency
-        ws_after_hook.plan_state_store[plan_run.id] = state
-        
-        # Call the simple notify function (no async needed)
-        ws_after_hook.notify_function(plan_id_to_use, state)
-        print(f"✅ Hook processed: step {step_index}, state: {state['state']}")
+    }
+    
+    # Report under our plan ID: bound for the running plan, else resolved through the mapping
+    original_plan_id = active_plan_run_id.get() or _PORTIA_TO_ORIGINAL.get(plan_run.id)
+    
+    plan_id_to_use = original_plan_id if original_plan_id else plan_run.id
+    
+    # Create state object for notification. Only this step's output is included;
+    # the notify function merges it with earlier steps when the state is read.
+    # The plan stays IN_PROGRESS even after the last step: Portia builds the run's final
+    # output and state after this hook returns, and execute_plan_async publishes those.
+    state = {
+        "plan_run_id": plan_id_to_use,
+        "state": "IN_PROGRESS",
+        "current_step_index": step_index,
+        "step_outputs": step_outputs,
+    }
+    
+    # Call the simple notify function (no async needed)
+    _NOTIFY(plan_id_to_use, state)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("✅ Hook processed: step %s, state: %s", step_index, state['state'])
 
 myPortia = Portia(
     config=google_config,
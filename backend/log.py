@@ -0,0 +1,18 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+# Handlers only enqueue records; formatting and stream I/O happen on the listener's
+# background thread, so plan workers and the event loop never block on stdout.
+log_queue: queue.Queue = queue.Queue(-1)
+
+logger = logging.getLogger("unto")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
+logger.propagate = False
+
+listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+listener.start()
+atexit.register(listener.stop)
@@ -1,21 +1,22 @@
+import threading
 from typing import Optional
-from pydantic import BaseModel
-from portia import (
-    LLMTool,
-)
-from portia.end_user import EndUser
+from pydantic import BaseModel, ConfigDict
+from portia.plan import Plan, PlanInput
 
-from tool.flight_search_tool import FlightSearchTool
 from constants import myPortia, myTools
 
-class FlightSearchOutput(BaseModel):
+class PlanOutputModel(BaseModel):
+    """Immutable base for the plan's structured output models."""
+    model_config = ConfigDict(frozen=True)
+
+class FlightSearchOutput(PlanOutputModel):
     Airline: Optional[str] = None
     deepLinkUrl: Optional[str] = None
     price: Optional[float] = None
     departTime: Optional[str] = None
     arrivalTime: Optional[str] = None
 
-class AccomodationSearchOutput(BaseModel):
+class AccomodationSearchOutput(PlanOutputModel):
     HotelName: Optional[str] = None
     bookingUrl: Optional[str] = None
     price: Optional[float] = None
@@ -23,11 +24,62 @@ class AccomodationSearchOutput(BaseModel):
     checkInTime: Optional[str] = None
     checkOutTime: Optional[str] = None
 
-class PlanOutputSchema(BaseModel):
+class PlanOutputSchema(PlanOutputModel):
     departureFlight: FlightSearchOutput = None
     returnFlight: FlightSearchOutput = None
     accommodation: AccomodationSearchOutput = None
 
+TRAVEL_QUERY = """
+        Search flight ticket and Hotel Accomodation. Use the following parameters:
+        - Departure city: $origin
+        - Arrival city: $destination
+        - Departure date: $departure_date
+        - Return date: $return_date
+        - Cabin class: $cabin_class
+        - Number of passengers: $passengers
+        Use any date respective if a relative date is provided.
+        Be sure to book both the departure and return flights.
+        Analyse the flights and accommodation data and return the best flight overview with summary and Deeplink url to book and accommodation details with summary and url to book.
+        The Deeplink url should be appended to https://www.skyscanner.co.in<CHOOSEN_DEEPLINK> before returning the response.
+        """
+
+TRAVEL_PLAN_INPUTS = [
+    PlanInput(name="$origin", description="Departure city"),
+    PlanInput(name="$destination", description="Arrival city"),
+    PlanInput(name="$departure_date", description="Departure date, possibly relative"),
+    PlanInput(name="$return_date", description="Return date, possibly relative"),
+    PlanInput(name="$cabin_class", description="Cabin class (economy, business, first, premiumeconomy)"),
+    PlanInput(name="$passengers", description="Number of passengers"),
+]
+
+# Generated once and reused: trip details are plan inputs, so every travel request shares one
+# plan and only pays for the planning LLM call when there's no plan yet. A run that fails
+# evicts it, so one bad planner output is replanned instead of breaking every later request.
+_travel_plan: Optional[Plan] = None
+_travel_plan_lock = threading.Lock()
+
+def get_travel_plan_template() -> Plan:
+    global _travel_plan
+    plan = _travel_plan
+    if plan is None:
+        with _travel_plan_lock:
+            plan = _travel_plan
+            if plan is None:
+                plan = _travel_plan = myPortia.plan(
+                    tools=myTools,
+                    query=TRAVEL_QUERY,
+                    plan_inputs=TRAVEL_PLAN_INPUTS,
+                    structured_output_schema=PlanOutputSchema,
+                )
+    return plan
+
+def evict_travel_plan_template(plan: Plan):
+    """Drop the shared plan, unless another run has already replaced it."""
+    global _travel_plan
+    with _travel_plan_lock:
+        if _travel_plan is plan:
+            _travel_plan = None
+
 def travel_plan(
     origin,
     destination,
@@ -36,25 +88,24 @@ def travel_plan(
     cabin_class,
     passengers,
 ): 
-    plan = myPortia.plan(
-        tools=myTools,
-        # If the user provided their travel details such as preferred cabin class, departure date, and return date.
-        query=f"""
-        Search flight ticket and Hotel Accomodation. Use the following parameters:
-        - Departure city: {origin}
-        - Arrival city: {destination}
-        - Departure date: {departure_date}
-        - Return date: {return_date}
-        - Cabin class: {cabin_class}
-        - Number of passengers: {passengers}
-        Use any date respective if a relative date is provided.
-        Be sure to book both the departure and return flights.
-        Analyse the flights and accommodation data and return the best flight overview with summary and Deeplink url to book and accommodation details with summary and url to book.
-        The Deeplink url should be appended to https://www.skyscanner.co.in<CHOOSEN_DEEPLINK> before returning the response.
-        """,
-        structured_output_schema=PlanOutputSchema,
-    )
+    plan = get_travel_plan_template()
     
-    # Execute the plan and return the result
-    result = myPortia.run_plan(plan)
-    return result
\ No newline at end of file
+    # Execute the plan with this trip's details bound to its inputs and return the result
+    try:
+        result = myPortia.run_plan(
+            plan,
+            plan_run_inputs=[
+                PlanInput(name="$origin", value=origin),
+                PlanInput(name="$destination", value=destination),
+                PlanInput(name="$departure_date", value=departure_date),
+                PlanInput(name="$return_date", value=return_date),
+                PlanInput(name="$cabin_class", value=cabin_class),
+                PlanInput(name="$passengers", value=passengers),
+            ],
+        )
+    except Exception:
+        evict_travel_plan_template(plan)
+        raise
+    if result.state == "FAILED":
+        evict_travel_plan_template(plan)
+    return result
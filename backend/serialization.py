@@ -0,0 +1,80 @@
+from decimal import Decimal
+from typing import Any, Callable, Dict
+
+import orjson
+from pydantic import BaseModel
+
+from log import logger
+
+
+# Serializers resolved once per output type, so hot paths do a single dict lookup
+# instead of re-probing each object with hasattr chains.
+_SERIALIZERS: Dict[type, Callable[[Any], Any]] = {}
+_ENCODERS: Dict[type, Callable[[Any], bytes]] = {}
+# orjson handles datetime, UUID, enums and dataclasses natively; these cover the rest
+_DEFAULTS: Dict[type, Callable[[Any], Any]] = {Decimal: str, set: list, frozenset: list}
+
+# Bound once at import so per-output calls skip the module attribute lookups
+_dumps = orjson.dumps
+_loads = orjson.loads
+_NON_STR_KEYS = orjson.OPT_NON_STR_KEYS
+
+# Already JSON-shaped; containers are left for the final orjson encode to walk
+_JSON_PRIMITIVES = (str, int, float, bool, list, dict, type(None))
+
+
+def _resolve_default(cls: type) -> Callable[[Any], Any]:
+    if issubclass(cls, BaseModel):
+        # Nested models keep their structure instead of collapsing to their repr
+        return lambda value: value.model_dump(mode="json", exclude_none=True)
+    return str
+
+
+def json_default(value: Any) -> Any:
+    """orjson default hook: typed dispatch for values it can't encode, str() for the rest."""
+    return _pick(_DEFAULTS, _resolve_default, value)(value)
+
+
+def _to_json_value(output: Any) -> Any:
+    # One orjson pass yields plain JSON values; anything it can't encode goes through json_default
+    return _loads(_dumps(output, default=json_default, option=_NON_STR_KEYS))
+
+
+def _resolve_serializer(cls: type) -> Callable[[Any], Any]:
+    if issubclass(cls, BaseModel):
+        # pydantic-core emits JSON-ready primitives in a single pass, skipping unset fields
+        return lambda output: output.model_dump(mode="json", exclude_none=True)
+    if hasattr(cls, 'dict'):
+        return lambda output: output.dict()
+    return _to_json_value
+
+
+def _resolve_encoder(cls: type) -> Callable[[Any], bytes]:
+    serializer = getattr(cls, '__pydantic_serializer__', None)
+    if serializer is not None:
+        return lambda output: serializer.to_json(output, exclude_none=True)
+    return lambda output: _dumps(str(output))
+
+
+def _pick(table: Dict[type, Callable], resolve: Callable[[type], Callable], output: Any) -> Callable:
+    cls = type(output)
+    fn = table.get(cls)
+    if fn is None:
+        fn = table[cls] = resolve(cls)
+    return fn
+
+
+def serialize_output(output: Any) -> Any:
+    """Convert a Portia output into a JSON-friendly value, falling back to str()."""
+    if isinstance(output, _JSON_PRIMITIVES):
+        return output
+    try:
+        return _pick(_SERIALIZERS, _resolve_serializer, output)(output)
+    except Exception as e:
+        logger.warning("⚠️ Error serializing output: %s", e)
+        return str(output)
+
+
+def encode_output(output: Any) -> bytes:
+    """Encode a Portia output straight to JSON bytes (pydantic-core for models, str() otherwise)."""
+    return _pick(_ENCODERS, _resolve_encoder, output)(output)
@@ -0,0 +1,42 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class ShardedStateStore:
+    """Dict-like store split into lock-striped shards.
+
+    Plan state is written from the event loop, the plan worker threads and the
+    Portia execution hook. Each key hashes to one of N shards with its own lock,
+    so concurrent plans rarely contend. Values are published by replacing them
+    as a whole (copy, update, replace), which lets readers skip the lock entirely.
+    """
+
+    def __init__(self, shard_count: int = 16):
+        self.shards: List[Tuple[threading.Lock, Dict[str, Any]]] = [
+            (threading.Lock(), {}) for _ in range(shard_count)
+        ]
+
+    def _shard(self, key: str) -> Tuple[threading.Lock, Dict[str, Any]]:
+        return self.shards[hash(key) % len(self.shards)]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._shard(key)[1].get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        lock, shard = self._shard(key)
+        with lock:
+            shard[key] = value
+
+    def update(self, key: str, fn: Callable[[Optional[Any]], Any]) -> Any:
+        """Atomically replace the value for key with fn(current value or None)."""
+        lock, shard = self._shard(key)
+        with lock:
+            value = fn(shard.get(key))
+            shard[key] = value
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._shard(key)[1]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import threading
+import weakref
+from contextvars import ContextVar
+from typing import Callable, Optional, TypeVar
+
+from apify_client import ApifyClient, ApifyClientAsync
+
+T = TypeVar("T")
+
+
+# One client per token, shared by every tool run so its HTTP session and TLS
+# connections are reused instead of rebuilt on each call.
+_clients: dict[str, ApifyClient] = {}
+
+# Caps concurrent actor runs so a burst of plans can't pile up unbounded Apify calls
+APIFY_MAX_CONCURRENCY = int(os.getenv("APIFY_MAX_CONCURRENCY", "8"))
+apify_call_slots = threading.BoundedSemaphore(APIFY_MAX_CONCURRENCY)
+
+# asyncio semaphores, and ApifyClientAsync's HTTP pool, are bound to the loop that first uses
+# them, so the async path keeps one per running loop (async clients also per token)
+_async_call_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, ApifyClientAsync]]" = weakref.WeakKeyDictionary()
+
+# Bound per plan run by app.py. Tools note each time they return stub rows instead of real
+# Apify results, so the run's outcome isn't cached as if the searches had succeeded.
+apify_failures: ContextVar[Optional[list]] = ContextVar("apify_failures", default=None)
+
+def record_apify_failure(reason: str):
+    failures = apify_failures.get()
+    if failures is not None:
+        failures.append(reason)
+
+def get_apify_client(api_token: str) -> ApifyClient:
+    client = _clients.get(api_token)
+    if client is None:
+        client = _clients[api_token] = ApifyClient(api_token)
+    return client
+
+def _for_running_loop(table: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]", factory: Callable[[], T]) -> T:
+    loop = asyncio.get_running_loop()
+    value = table.get(loop)
+    if value is None:
+        # Values may hold their loop alive, so drop closed loops' entries rather than rely on GC
+        for closed in [other for other in list(table.keys()) if other.is_closed()]:
+            table.pop(closed, None)
+        value = table[loop] = factory()
+    return value
+
+def get_async_apify_client(api_token: str) -> ApifyClientAsync:
+    clients = _for_running_loop(_async_clients, dict)
+    client = clients.get(api_token)
+    if client is None:
+        client = clients[api_token] = ApifyClientAsync(api_token)
+    return client
+
+def async_apify_call_slots() -> asyncio.Semaphore:
+    return _for_running_loop(_async_call_slots, lambda: asyncio.Semaphore(APIFY_MAX_CONCURRENCY))
@@ -1,9 +1,15 @@
 import os
 from typing import Type
-from apify_client import ApifyClient
-from portia import Tool, ToolRunContext
+from portia.tool import Tool, ToolRunContext
 from pydantic import BaseModel, Field
 
+from tool.apify_clients import apify_call_slots, async_apify_call_slots, get_apify_client, get_async_apify_client, record_apify_failure
+
+
+FLIGHT_ACTOR_ID = "tiveIS4hgXOMtu3Hf"
+# Apify pages results server-side, so only this many rows are ever fetched
+MAX_FLIGHTS = 5
+
 
 class FlightInputSchema(BaseModel):
     """Schema for flight booking details."""
@@ -17,6 +23,31 @@ class FlightOutputSchema(BaseModel):
     """Schema for flight search results."""
     flights: list[dict] = Field(..., description="List of available flights")
 
+def _flight_run_input(origin: str, destination: str, departure_date: str, cabin_class: str, passengers: int) -> dict:
+    return {
+        "origin.0": origin,
+        "target.0": destination,
+        "depart.0": departure_date,
+        "cabin_class": cabin_class,
+        "adults": passengers,
+        "currency": "INR",
+        "alternate_origin": True,
+        "alternate_target": True,
+    }
+
+def _stub_flights(origin: str, destination: str, departure_date: str, cabin_class: str, passengers: int, **extra) -> FlightOutputSchema:
+    """Stub result returned when the Apify actor can't be used."""
+    record_apify_failure(f"flight search: {extra.get('error') or extra.get('note')}")
+    return FlightOutputSchema(flights=[{
+        "origin": origin,
+        "destination": destination,
+        "departure_date": departure_date,
+        "cabin_class": cabin_class,
+        "passengers": passengers,
+        "price": "N/A",
+        **extra,
+    }])
+
 class FlightSearchTool(Tool[str]):
     """Tool for searching flights."""
     id: str = "flight_search_tool"
@@ -29,43 +60,31 @@ class FlightSearchTool(Tool[str]):
         api_token = os.getenv("APIFY_API_TOKEN")
         if not api_token:
             # Return stub data if API token is missing
-            return FlightOutputSchema(flights=[{
-                "origin": origin,
-                "destination": destination,
-                "departure_date": departure_date,
-                "cabin_class": cabin_class,
-                "passengers": passengers,
-                "price": "N/A",
-                "note": "APIFY_API_TOKEN not configured - returning stub data"
-            }])
-            
-        client = ApifyClient(api_token)
-        run_input={
-            "origin.0": origin,
-            "target.0": destination,
-            "depart.0": departure_date,
-            "cabin_class": cabin_class,
-            "adults": passengers,
-            "currency": "INR",
-            "alternate_origin": True,
-            "alternate_target": True,
-        }
+            return _stub_flights(origin, destination, departure_date, cabin_class, passengers, note="APIFY_API_TOKEN not configured - returning stub data")
+
+        client = get_apify_client(api_token)
+        run_input = _flight_run_input(origin, destination, departure_date, cabin_class, passengers)
         try:
-            run = client.actor("tiveIS4hgXOMtu3Hf").call(run_input=run_input)
-            list_flights = []
-            for i, item in enumerate(client.dataset(run["defaultDatasetId"]).iterate_items()):
-                if i >= 5:
-                    break
-                list_flights.append(item)
+            with apify_call_slots:
+                run = client.actor(FLIGHT_ACTOR_ID).call(run_input=run_input)
+                list_flights = list(client.dataset(run["defaultDatasetId"]).iterate_items(limit=MAX_FLIGHTS))
             return FlightOutputSchema(flights=list_flights)
         except Exception as e:
             # Return stub data if API call fails
-            return FlightOutputSchema(flights=[{
-                "origin": origin,
-                "destination": destination,
-                "departure_date": departure_date,
-                "cabin_class": cabin_class,
-                "passengers": passengers,
-                "price": "N/A",
-                "error": f"API call failed: {str(e)}"
-            }])
+            return _stub_flights(origin, destination, departure_date, cabin_class, passengers, error=f"API call failed: {str(e)}")
+
+    async def arun(self, _: ToolRunContext, origin: str, destination: str, departure_date: str, cabin_class: str, passengers: int) -> FlightOutputSchema:
+        """Async variant of run, so the actor call doesn't hold a thread while it waits on Apify."""
+        api_token = os.getenv("APIFY_API_TOKEN")
+        if not api_token:
+            return _stub_flights(origin, destination, departure_date, cabin_class, passengers, note="APIFY_API_TOKEN not configured - returning stub data")
+
+        client = get_async_apify_client(api_token)
+        run_input = _flight_run_input(origin, destination, departure_date, cabin_class, passengers)
+        try:
+            async with async_apify_call_slots():
+                run = await client.actor(FLIGHT_ACTOR_ID).call(run_input=run_input)
+                list_flights = [item async for item in client.dataset(run["defaultDatasetId"]).iterate_items(limit=MAX_FLIGHTS)]
+            return FlightOutputSchema(flights=list_flights)
+        except Exception as e:
+            return _stub_flights(origin, destination, departure_date, cabin_class, passengers, error=f"API call failed: {str(e)}")
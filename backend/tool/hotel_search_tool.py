@@ -1,9 +1,15 @@
 import os
 from typing import Type
-from apify_client import ApifyClient
-from portia import Tool, ToolRunContext
+from portia.tool import Tool, ToolRunContext
 from pydantic import BaseModel, Field
 
+from tool.apify_clients import apify_call_slots, async_apify_call_slots, get_apify_client, get_async_apify_client, record_apify_failure
+
+
+ACCOMMODATION_ACTOR_ID = "viXne7lpALg8viFdh"
+# Matches the "up to 5" promised in the tool description; applied to the actor and the dataset read
+MAX_ACCOMMODATIONS = 5
+
 
 class AccomodationInputSchema(BaseModel):
     """Schema for accommodation booking details."""
@@ -16,6 +22,42 @@ class AccomodationOutputSchema(BaseModel):
     """Schema for accommodation search results."""
     accommodations: list[dict] = Field(..., description="List of available accommodations")
 
+def _accommodation_run_input(location: str, check_in_date: str, check_out_date: str, guests: int) -> dict:
+    return {
+        "adults": guests,
+        "location": [
+            location
+        ],
+        "check_in": check_in_date,
+        "check_out": check_out_date,
+        "currency": "INR", # Set dynamic
+        "price": "N/A",
+        "limit": MAX_ACCOMMODATIONS,
+        "no_experiment": False,
+        "search_mode": "hotel",
+        "trip_length": "date"
+    }
+
+def _unconfigured_accommodations(run_input: dict) -> AccomodationOutputSchema:
+    """Stub result returned when no Apify token is configured."""
+    record_apify_failure("accommodation search: APIFY_API_TOKEN not configured")
+    return AccomodationOutputSchema(accommodations=[{
+        **run_input,
+        "note": "APIFY_API_TOKEN not configured - returning stub data"
+    }])
+
+def _failed_accommodations(location: str, check_in_date: str, check_out_date: str, guests: int, error: Exception) -> AccomodationOutputSchema:
+    """Stub result returned when the Apify actor call fails."""
+    record_apify_failure(f"accommodation search: API call failed: {error}")
+    return AccomodationOutputSchema(accommodations=[{
+        "location": location,
+        "check_in_date": check_in_date,
+        "check_out_date": check_out_date,
+        "guests": guests,
+        "price": "N/A",
+        "error": f"API call failed: {str(error)}"
+    }])
+
 class AccomodationSearchTool(Tool[str]):
     """Tool for searching accommodations."""
     id: str = "accommodation_search_tool"
@@ -26,51 +68,30 @@ class AccomodationSearchTool(Tool[str]):
 
     def run(self, _: ToolRunContext, location: str, check_in_date: str, check_out_date: str, guests: int) -> AccomodationOutputSchema:
         api_token = os.getenv("APIFY_API_TOKEN")
+        run_input = _accommodation_run_input(location, check_in_date, check_out_date, guests)
         if not api_token:
-            return AccomodationOutputSchema(accommodations=[{
-                "adults": guests,
-                "location": [
-                    location
-                ],
-                "check_in": check_in_date,
-                "check_out": check_out_date,
-                "currency": "INR", # Set dynamic
-                "price": "N/A",
-                "limit": 10,
-                "no_experiment": False,
-                "search_mode": "hotel",
-                "trip_length": "date",
-                "note": "APIFY_API_TOKEN not configured - returning stub data"
-            }])
-        client = ApifyClient(api_token)
-        run_input={
-            "adults": guests,
-            "location": [
-                location
-            ],
-            "check_in": check_in_date,
-            "check_out": check_out_date,
-            "currency": "INR", # Set dynamic
-            "price": "N/A",
-            "limit": 10,
-            "no_experiment": False,
-            "search_mode": "hotel",
-            "trip_length": "date"
-        }
+            return _unconfigured_accommodations(run_input)
+        client = get_apify_client(api_token)
         try:
-            run = client.actor("viXne7lpALg8viFdh").call(run_input=run_input)
-            list_accommodations = []
-            for i, item in enumerate(client.dataset(run["defaultDatasetId"]).iterate_items()):
-                list_accommodations.append(item)
+            with apify_call_slots:
+                run = client.actor(ACCOMMODATION_ACTOR_ID).call(run_input=run_input)
+                list_accommodations = list(client.dataset(run["defaultDatasetId"]).iterate_items(limit=MAX_ACCOMMODATIONS))
             return AccomodationOutputSchema(accommodations=list_accommodations)
         except Exception as e:
             # Return stub data if API call fails
-            return AccomodationOutputSchema(accommodations=[{
-                "location": location,
-                "check_in_date": check_in_date,
-                "check_out_date": check_out_date,
-                "guests": guests,
-                "price": "N/A",
-                "error": f"API call failed: {str(e)}"
-            }])
-            
\ No newline at end of file
+            return _failed_accommodations(location, check_in_date, check_out_date, guests, e)
+
+    async def arun(self, _: ToolRunContext, location: str, check_in_date: str, check_out_date: str, guests: int) -> AccomodationOutputSchema:
+        """Async variant of run, so the actor call doesn't hold a thread while it waits on Apify."""
+        api_token = os.getenv("APIFY_API_TOKEN")
+        run_input = _accommodation_run_input(location, check_in_date, check_out_date, guests)
+        if not api_token:
+            return _unconfigured_accommodations(run_input)
+        client = get_async_apify_client(api_token)
+        try:
+            async with async_apify_call_slots():
+                run = await client.actor(ACCOMMODATION_ACTOR_ID).call(run_input=run_input)
+                list_accommodations = [item async for item in client.dataset(run["defaultDatasetId"]).iterate_items(limit=MAX_ACCOMMODATIONS)]
+            return AccomodationOutputSchema(accommodations=list_accommodations)
+        except Exception as e:
+            return _failed_accommodations(location, check_in_date, check_out_date, guests, e)
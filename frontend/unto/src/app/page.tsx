@@ -51,8 +51,24 @@ interface PlanState {
   outputs: Record<string, unknown>
   final_output?: Record<string, unknown> | string
   error?: string
+  delta?: boolean
 }
 
+// Delta responses only carry step outputs newer than the step we asked from; fold them into what we have
+const mergeDeltaOutputs = (prev: Record<string, unknown>, next: Record<string, unknown>): Record<string, unknown> => ({
+  ...prev,
+  ...next,
+  step_outputs: {
+    ...(prev.step_outputs as Record<string, unknown> | undefined),
+    ...(next.step_outputs as Record<string, unknown> | undefined),
+  },
+})
+
+// How long the backend may hold a state request open waiting for the plan to advance
+const LONG_POLL_WAIT_MS = 25000
+// Delay before retrying after a failed state request
+const POLL_RETRY_MS = 5000
+
 const steps = [
   { id: "destination", title: "Where to?", icon: MapPin },
   { id: "dates", title: "When tho?", icon: Calendar },
@@ -121,7 +137,6 @@ export default function TravelPlannerPage() {
     passengers: 1,
   })
   const [planState, setPlanState] = useState<PlanState | null>(null)
-  const pollingIntervalRef = useRef<NodeJS.Timeout | null>(null)
   
   // Track polling state to prevent race conditions
   const isPollingRef = useRef(false)
@@ -197,32 +212,35 @@ export default function TravelPlannerPage() {
     return summaryParts.join('\n')
   }, [planState?.final_output])
 
-  // Polling function to check plan state
-  const pollPlanState = useCallback(async (planRunId: string) => {
+  // Polling function to check plan state. With sinceStep set, the backend holds the
+  // request until the plan moves past that step (or LONG_POLL_WAIT_MS elapses).
+  const pollPlanState = useCallback(async (planRunId: string, sinceStep?: number): Promise<PlanState | null> => {
     // Prevent race conditions by checking if we're already polling this plan
     if (isPollingRef.current || currentPlanIdRef.current !== planRunId) {
-      return
+      return null
     }
 
     isPollingRef.current = true
 
     try {
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/plan/${planRunId}/state`)
+      const query = sinceStep === undefined ? "" : `?wait_ms=${LONG_POLL_WAIT_MS}&since_step=${sinceStep}`
+      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/plan/${planRunId}/state${query}`)
       
       if (!response.ok) {
         if (response.status === 404) {
           console.warn("Plan not found:", planRunId)
-          return
+          return null
         }
         console.warn("Failed to fetch plan state:", response.status)
-        return
+        return null
       }
 
-      const state = await response.json()
+      const received: PlanState = await response.json()
       
       // Only update state if this is still the current plan
       if (currentPlanIdRef.current === planRunId) {
         setPlanState((prev) => {
+          const state = received.delta && prev ? { ...received, outputs: mergeDeltaOutputs(prev.outputs, received.outputs) } : received
           if (!prev) return state
           
           // Use a more efficient comparison
@@ -236,52 +254,42 @@ export default function TravelPlannerPage() {
         })
 
         // Stop polling if plan is complete or failed
-        if (state.state === "COMPLETE" || state.state === "FAILED") {
-          if (pollingIntervalRef.current) {
-            clearInterval(pollingIntervalRef.current)
-            pollingIntervalRef.current = null
-          }
+        if (received.state === "COMPLETE" || received.state === "FAILED") {
           currentPlanIdRef.current = null
           setCurrentStep(4) // Move to results step
         }
       }
+      return received
     } catch (error) {
       console.error("Error polling plan state:", error)
+      return null
     } finally {
       isPollingRef.current = false
     }
   }, [])
 
   // Start polling when we have a plan run ID
-  const startPolling = useCallback((planRunId: string) => {
-    // Clear any existing interval and reset state
-    if (pollingIntervalRef.current) {
-      clearInterval(pollingIntervalRef.current)
-      pollingIntervalRef.current = null
-    }
-    
-    // Set the current plan ID for race condition prevention
+  const startPolling = useCallback(async (planRunId: string) => {
+    // Set the current plan ID for race condition prevention; any previous loop exits on its next check
     currentPlanIdRef.current = planRunId
     isPollingRef.current = false
 
-    // Poll immediately
-    pollPlanState(planRunId)
-
-    // Set up interval polling every 15 seconds (reduced from 20s for better UX)
-    const interval = setInterval(() => {
-      pollPlanState(planRunId)
-    }, 15000)
-
-    pollingIntervalRef.current = interval
+    // Long-poll: each request returns as soon as the plan advances, so the next one
+    // starts immediately instead of waiting out a fixed interval
+    let sinceStep: number | undefined
+    while (currentPlanIdRef.current === planRunId) {
+      const state = await pollPlanState(planRunId, sinceStep)
+      if (state) {
+        sinceStep = state.current_step_index
+      } else {
+        await new Promise((resolve) => setTimeout(resolve, POLL_RETRY_MS))
+      }
+    }
   }, [pollPlanState])
 
   // Cleanup polling on component unmount
   useEffect(() => {
     return () => {
-      if (pollingIntervalRef.current) {
-        clearInterval(pollingIntervalRef.current)
-        pollingIntervalRef.current = null
-      }
       currentPlanIdRef.current = null
       isPollingRef.current = false
     }
@@ -1013,10 +1021,7 @@ export default function TravelPlannerPage() {
             <Button
               onClick={() => {
                 // Clean up polling when starting over
-                if (pollingIntervalRef.current) {
-                  clearInterval(pollingIntervalRef.current)
-                  pollingIntervalRef.current = null
-                }
+                currentPlanIdRef.current = null
                 
                 setCurrentStep(0)
                 setPlanState(null)